@@ -3,6 +3,8 @@
 See: https://setuptools.pypa.io/en/latest/build_meta.html#dynamic-build-dependencies-and-other-build-meta-tweaks
 """
 
+import os
+
 from setuptools import build_meta as _orig
 from setuptools.build_meta import *
 
@@ -14,10 +16,12 @@ def get_requires_for_build_sdist(config_settings=None):
     ]
 
 def get_requires_for_build_wheel(config_settings=None):
+    if os.environ.get("CFFSUBR_USE_PREBUILT_TX"):
+        # the 'tx' executable is not compiled but copied from the given path
+        return _orig.get_requires_for_build_wheel(config_settings)
     return _orig.get_requires_for_build_wheel(config_settings) + [
         # required for building the 'tx' executable from afdko package
         "cmake",
         "ninja",
-        "scikit-build",
     ]
 
@@ -4,8 +4,8 @@ from distutils.file_util import copy_file
 from distutils.dir_util import mkpath
 from distutils import log
 import os
+import shutil
 import subprocess
-import sys
 
 
 cmdclass = {}
@@ -23,21 +23,38 @@ else:
 
 
 class Executable(Extension):
+    """An executable built from a CMake project and bundled inside a package."""
+
     if os.name == "nt":
         suffix = ".exe"
     else:
         suffix = ""
 
-    def __init__(self, name, build_cmd, output_dir=".", cwd=None, env=None):
+    def __init__(self, name, source_dir, cmake_args=(), env=None, prebuilt=None):
         Extension.__init__(self, name, sources=[])
-        self.target = self.name.split(".")[-1] + self.suffix
-        self.build_cmd = build_cmd
-        self.output_dir = output_dir
-        self.cwd = cwd
+        self.target = self.name.split(".")[-1]
+        self.source_dir = source_dir
+        self.cmake_args = list(cmake_args)
         self.env = env
+        # optional path to an already built executable to use instead
+        self.prebuilt = prebuilt
 
 
 class ExecutableBuildExt(build_ext):
+    def finalize_options(self):
+        build_ext.finalize_options(self)
+        # number of parallel compile jobs for the executables' native build: taken
+        # from 'build_ext --parallel/-j N' if given, else from $MAX_JOBS, else
+        # defaults to the number of CPUs
+        if self.parallel:
+            self.build_jobs = int(self.parallel)
+        else:
+            self.build_jobs = int(os.environ.get("MAX_JOBS") or os.cpu_count() or 1)
+        # wrap the C/C++ compiler with a compiler cache if one is available, so
+        # that rebuilding unchanged sources is just a cache lookup; on CI, point
+        # $CCACHE_DIR or $SCCACHE_DIR to a persistent (cached) directory.
+        self.compiler_launcher = self._find_compiler_launcher()
+
     def get_ext_filename(self, ext_name):
         for ext in self.extensions:
             if isinstance(ext, Executable):
@@ -49,42 +66,105 @@ class ExecutableBuildExt(build_ext):
             build_ext.build_extension(self, ext)
             return
 
-        exe_fullpath = os.path.join(ext.output_dir, ext.target)
-        cmd = ext.build_cmd
-        log.debug("running '{}'".format(cmd))
+        dest_path = self.get_ext_fullpath(ext.name)
+        mkpath(os.path.dirname(dest_path), verbose=self.verbose, dry_run=self.dry_run)
+
+        if ext.prebuilt:
+            if not os.path.isfile(ext.prebuilt):
+                from distutils.errors import DistutilsFileError
+
+                raise DistutilsFileError(
+                    "prebuilt executable '{}' not found".format(ext.prebuilt)
+                )
+            log.info("using prebuilt '{}' executable".format(ext.prebuilt))
+            copy_file(
+                ext.prebuilt, dest_path, verbose=self.verbose, dry_run=self.dry_run
+            )
+            return
+
+        build_dir = os.path.join(self.build_temp, ext.name)
+        # the CMake project puts all its executables in ${CMAKE_BINARY_DIR}/bin
+        exe_fullpath = os.path.join(build_dir, "bin", ext.target + ext.suffix)
+
+        # Generate the Ninja build files once, then build only the one target we
+        # need; ninja schedules all the translation units across build_jobs cores.
+        configure_cmd = [
+            "cmake",
+            "-S",
+            ext.source_dir,
+            "-B",
+            build_dir,
+            "-G",
+            "Ninja",
+            "-DCMAKE_BUILD_TYPE=Release",
+        ] + ext.cmake_args
+        if self.compiler_launcher:
+            configure_cmd += [
+                f"-DCMAKE_C_COMPILER_LAUNCHER={self.compiler_launcher}",
+                f"-DCMAKE_CXX_COMPILER_LAUNCHER={self.compiler_launcher}",
+            ]
+        build_cmd = [
+            "cmake",
+            "--build",
+            build_dir,
+            "--target",
+            ext.target,
+            "--parallel",
+            str(self.build_jobs),
+            "--config",
+            "Release",
+        ]
+
         if not self.dry_run:
+            mkpath(build_dir, verbose=self.verbose)
             env = dict(os.environ)
             if ext.env:
                 env.update(ext.env)
-            p = subprocess.run(cmd, cwd=ext.cwd, env=env, shell=True)
-            if p.returncode != 0:
-                from distutils.errors import DistutilsExecError
+            if os.name == "nt" and "VCINSTALLDIR" not in env:
+                # Ninja expects cl.exe & co. to be on the PATH: activate the MSVC
+                # environment unless we are already running inside one.
+                env.update((k.upper(), v) for k, v in self._get_vc_env().items())
+            for cmd in (configure_cmd, build_cmd):
+                self._run_command(cmd, env)
 
-                raise DistutilsExecError(
-                    "running '{}' command failed".format(ext.build_cmd)
-                )
+        copy_file(exe_fullpath, dest_path, verbose=self.verbose, dry_run=self.dry_run)
 
-        dest_path = self.get_ext_fullpath(ext.name)
-        mkpath(os.path.dirname(dest_path), verbose=self.verbose, dry_run=self.dry_run)
+    def _run_command(self, cmd, env):
+        # run the argument list directly, without going through a shell
+        cmdline = subprocess.list2cmdline(cmd)
+        log.info("running '{}'".format(cmdline))
+        p = subprocess.run(cmd, env=env)
+        if p.returncode != 0:
+            from distutils.errors import DistutilsExecError
 
-        copy_file(exe_fullpath, dest_path, verbose=self.verbose, dry_run=self.dry_run)
+            raise DistutilsExecError("running '{}' command failed".format(cmdline))
 
+    @staticmethod
+    def _find_compiler_launcher():
+        # ccache has limited support for MSVC, prefer sccache on Windows
+        candidates = ("sccache",) if os.name == "nt" else ("ccache", "sccache")
+        for name in candidates:
+            launcher = shutil.which(name)
+            if launcher:
+                log.info("using '{}' as compiler launcher".format(launcher))
+                return launcher
+        return None
 
-cmdclass["build_ext"] = ExecutableBuildExt
+    def _get_vc_env(self):
+        from distutils._msvccompiler import PLAT_TO_VCVARS, _get_vc_env
+
+        return _get_vc_env(PLAT_TO_VCVARS[self.plat_name])
 
-afdko_root_dir = os.path.join("external", "afdko")
-afdko_output_dir = os.path.join(afdko_root_dir, "build", "bin")
-build_release_cmd = f"{sys.executable} setup.py build --build-scripts build/bin"
+
+cmdclass["build_ext"] = ExecutableBuildExt
 
 tx = Executable(
     "cffsubr.tx",
-    build_cmd=build_release_cmd,
-    cwd=afdko_root_dir,
-    output_dir=afdko_output_dir,
-    # we don't care about the precise afdko version, but we need *some* version
-    # otherwise building a wheel from a cffsubr sdist tarball fails because the
-    # afdko submodule in the unzipped sdist isn't recognized as a git repo
-    env={"SETUPTOOLS_SCM_PRETEND_VERSION_FOR_AFDKO": "0.0.0"},
+    source_dir=os.path.join("external", "afdko"),
+    # only the C tools are needed, skip configuring afdko's test suite
+    cmake_args=["-DBUILD_TESTING=OFF"],
+    # skip compiling tx and bundle this executable instead, if set
+    prebuilt=os.environ.get("CFFSUBR_USE_PREBUILT_TX"),
 )
 
 with open("README.md", "r", encoding="utf-8") as readme:
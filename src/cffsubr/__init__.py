@@ -1,10 +1,14 @@
+import atexit
+import concurrent.futures
+import contextlib
 import copy
 import enum
 import io
 import subprocess
 import os
 import tempfile
-from typing import BinaryIO, Optional, Union
+import threading
+from typing import BinaryIO, Iterable, List, Optional, Tuple, Union
 import sys
 
 try:
@@ -19,9 +23,20 @@ else:
         return as_file(files(package).joinpath(resource))
 
 from fontTools import ttLib
+from fontTools.ttLib.sfnt import SFNTWriter
 
+# the 'desubroutinize' method is dynamically added to the CFF table class
+# as a side-effect of importing the fontTools.subset.cff module...
+from fontTools.subset import cff as _cff_subset  # noqa: F401
 
-__all__ = ["subroutinize", "desubroutinize", "has_subroutines", "Error"]
+
+__all__ = [
+    "subroutinize",
+    "subroutinize_many",
+    "desubroutinize",
+    "has_subroutines",
+    "Error",
+]
 
 
 try:
@@ -51,11 +66,35 @@ class Error(Exception):
     pass
 
 
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
 TX_EXE = "tx"
 if sys.platform == "win32":
     TX_EXE += ".exe"
 
 
+_tx_path: Optional[str] = None
+_tx_path_lock = threading.Lock()
+# Keeps the tx resource context open until exit: if the package is imported from
+# a zip file, tx is extracted to a temporary file which is only removed on close.
+_resources = contextlib.ExitStack()
+atexit.register(_resources.close)
+
+
+def _get_tx_path() -> str:
+    """Return the filesystem path of the embedded tx executable.
+
+    The path is computed the first time this is called and then reused.
+    """
+    global _tx_path
+    if _tx_path is None:
+        with _tx_path_lock:
+            if _tx_path is None:
+                _tx_path = str(_resources.enter_context(path(__name__, TX_EXE)))
+    return _tx_path
+
+
 def _run_embedded_tx(*args, **kwargs):
     """Run the embedded tx executable with the list of positional arguments.
 
@@ -65,16 +104,60 @@ def _run_embedded_tx(*args, **kwargs):
         subprocess.CompletedProcess object with the following attributes:
         args, returncode, stdout, stderr.
     """
-    with path(__name__, TX_EXE) as tx_cli:
-        return subprocess.run([str(tx_cli)] + list(args), **kwargs)
+    return subprocess.run((_get_tx_path(),) + args, **kwargs)
+
+
+def _memfd_write(data: BytesLike) -> Optional[int]:
+    """Write data to a new anonymous in-memory file and return its descriptor.
+
+    Returns None if memfd_create is not supported on the current platform.
+    """
+    if not hasattr(os, "memfd_create"):
+        return None
+    try:
+        fd = os.memfd_create("tx-input")
+    except OSError:
+        return None
+    try:
+        _write_all(fd, data)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _write_all(fd: int, data: BytesLike):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _write_tmp(data: BytesLike) -> str:
+    """Write data to a new temporary file and return its path."""
+    fd, tmp_path = tempfile.mkstemp(prefix="tx-")
+    try:
+        _write_all(fd, data)
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    os.close(fd)
+    return tmp_path
 
 
-def _tx_subroutinize(data: bytes, output_format: str = CFFTableTag.CFF) -> bytes:
+def _mk_output_tmp() -> str:
+    """Create a new empty temporary file and return its path."""
+    fd, tmp_path = tempfile.mkstemp(prefix="tx-")
+    os.close(fd)
+    return tmp_path
+
+
+def _tx_subroutinize(data: BytesLike, output_format: str = CFFTableTag.CFF) -> bytes:
     """Run tx subroutinizer on OTF or CFF table raw data.
 
     Args:
-        data (bytes): CFF 1.0 table data, or an entire OTF sfnt data containing
-            either 'CFF ' or 'CFF2' table.
+        data (bytes-like): CFF 1.0 table data, or an entire OTF sfnt data
+            containing either 'CFF ' or 'CFF2' table.
         output_format (str): the format of the output table, 'CFF ' or 'CFF2'.
 
     Returns:
@@ -84,45 +167,63 @@ def _tx_subroutinize(data: bytes, output_format: str = CFFTableTag.CFF) -> bytes
     Raises:
         cffsubr.Error if subroutinization process fails.
     """
-    if not isinstance(data, bytes):
+    if not isinstance(data, (bytes, bytearray, memoryview)):
         raise TypeError(f"expected bytes, found {type(data).__name__}")
     output_format = CFFTableTag(output_format.rjust(4))
-    # We can't read from stdin because of this issue:
-    # https://github.com/adobe-type-tools/afdko/issues/937
-    with tempfile.NamedTemporaryFile(prefix="tx-", delete=False) as input_tmp:
-        input_tmp.write(data)
-
+    # A new tx process is started for each call: tx has no mode for serving
+    # multiple requests from one long-running process, and chaining several
+    # '-o output input' jobs in a single invocation is not reliable (tx can hang
+    # on the second job). Use subroutinize_many to overlap several tx runs.
     args = [f"-{output_format.rstrip().lower()}", "+S", "+b"]
     kwargs = dict(check=True, stderr=subprocess.PIPE)
 
+    # We can't read from stdin because of this issue:
+    # https://github.com/adobe-type-tools/afdko/issues/937
+    # On Linux we keep the input in an anonymous in-memory file which tx can open
+    # by path via procfs; elsewhere we fall back to a temporary file on disk.
+    input_fd = _memfd_write(data)
+    if input_fd is not None:
+        input_path = f"/proc/self/fd/{input_fd}"
+        # The descriptor is close-on-exec: only the tx process started below gets
+        # it, not other child processes started meanwhile from other threads.
+        kwargs["pass_fds"] = (input_fd,)
+    else:
+        input_path = _write_tmp(data)
+
     if sys.platform == "win32":
         # On Windows, we also can't write to stdout and capture output, because tx
         # doesn't seem to correctly handle binary data in stdout.
         # https://github.com/adobe-type-tools/cffsubr/pull/4#issuecomment-635624491
-        with tempfile.NamedTemporaryFile(prefix="tx-", delete=False) as output_tmp:
-            output_tmp.write(data)
-        args.extend(["-o", output_tmp.name])
+        output_path = _mk_output_tmp()
+        args.extend(["-o", output_path])
     else:
         # On Unix we write to stdout and capture output
         kwargs["stdout"] = subprocess.PIPE
-        output_tmp = None
+        # All other file descriptors are closed in tx (close_fds=True by default).
+        # This rules out posix_spawn, but on Linux CPython >= 3.10 still launches
+        # tx with vfork rather than fork, so the cost of copying the page tables
+        # of a big parent process is avoided as well.
+        output_path = None
 
-    args.append(input_tmp.name)
+    args.append(input_path)
 
     try:
         result = _run_embedded_tx(*args, **kwargs)
     except subprocess.CalledProcessError as e:
         raise Error(e.stderr.decode())
     else:
-        if output_tmp is not None:
-            with open(output_tmp.name, "rb") as fp:
+        if output_path is not None:
+            with open(output_path, "rb") as fp:
                 output_data = fp.read()
         else:
             output_data = result.stdout
     finally:
-        os.remove(input_tmp.name)
-        if output_tmp is not None:
-            os.remove(output_tmp.name)
+        if input_fd is not None:
+            os.close(input_fd)
+        else:
+            os.remove(input_path)
+        if output_path is not None:
+            os.remove(output_path)
 
     return output_data
 
@@ -141,11 +242,101 @@ def _sniff_cff_table_format(otf: ttLib.TTFont) -> CFFTableTag:
     return cff_tag
 
 
+# The sfnt tables that tx reads besides 'CFF ' or 'CFF2' (e.g. OS/2.fsType, name
+# strings, head.unitsPerEm, and the metrics and variation tables of CFF2 fonts);
+# tx also requires 'cmap' to be present when the input is an OTF.
+_TX_INPUT_TABLES = frozenset(
+    [
+        "OS/2",
+        "cmap",
+        "head",
+        "hhea",
+        "hmtx",
+        "maxp",
+        "name",
+        "post",
+        "vhea",
+        "vmtx",
+        "VORG",
+        "avar",
+        "fvar",
+        "HVAR",
+        "MVAR",
+        "VVAR",
+    ]
+)
+
+
+def _compile_tx_input(otf: ttLib.TTFont, cff_tag: CFFTableTag) -> memoryview:
+    """Return a minimal OTF containing only the tables that tx needs.
+
+    Tables which were not loaded or modified are copied as they are from the
+    original font file, without compiling them. The returned memoryview shares
+    the buffer it was written to, avoiding one more copy of the data.
+    """
+    tags = [tag for tag in otf.keys() if tag == cff_tag or tag in _TX_INPUT_TABLES]
+
+    # Like TTFont.save, compile the tables a table depends on before the table
+    # itself, as compiling them can update it: e.g. hmtx.compile() sets
+    # hhea.numberOfHMetrics, which tx needs to read the CFF2 advance widths.
+    table_data = {}
+
+    def compile_table(tag):
+        table_data[tag] = None  # mark as visited
+        for dependency in ttLib.getTableClass(tag).dependencies:
+            if dependency not in table_data and dependency in otf:
+                compile_table(dependency)
+        table_data[tag] = otf.getTableData(tag)
+
+    for tag in tags:
+        if tag not in table_data:
+            compile_table(tag)
+
+    buf = io.BytesIO()
+    writer = SFNTWriter(buf, len(tags), sfntVersion="OTTO")
+    for tag in tags:
+        writer[tag] = table_data[tag]
+    writer.close()
+    return buf.getbuffer()
+
+
+def _copy_font(otf: ttLib.TTFont) -> ttLib.TTFont:
+    """Return a copy of the font, loaded anew from its compiled data.
+
+    This is cheaper than copy.deepcopy for fonts with many loaded tables.
+    """
+    glyph_order = otf.getGlyphOrder()
+    recalcTimestamp = otf.recalcTimestamp
+    buf = io.BytesIO()
+    # The bounding boxes must be recalculated here: the copy's tables that are not
+    # decompiled again will be saved as they are compiled now. But the input font's
+    # head.modified timestamp should not be touched by making a copy.
+    otf.recalcTimestamp = False
+    try:
+        otf.save(buf)
+    finally:
+        otf.recalcTimestamp = recalcTimestamp
+    buf.seek(0)
+    font = ttLib.TTFont(
+        buf,
+        # A lazy=True font can't be saved to a path: fontTools then checks whether
+        # the path is the reader's file, and a BytesIO has no name. Tables are only
+        # decompiled when accessed with lazy=None as well.
+        lazy=False if otf.lazy is False else None,
+        recalcBBoxes=otf.recalcBBoxes,
+        recalcTimestamp=recalcTimestamp,
+        cfg=otf.cfg,
+    )
+    font.setGlyphOrder(glyph_order)
+    return font
+
+
 def subroutinize(
     otf: ttLib.TTFont,
     cff_version: Optional[int] = None,
     keep_glyph_names: bool = True,
     inplace: bool = True,
+    skip_if_subroutinized: bool = False,
 ) -> ttLib.TTFont:
     """Run subroutinizer on a FontTools TTFont's 'CFF ' or 'CFF2' table.
 
@@ -160,7 +351,13 @@ def subroutinize(
             to preserve the glyph names. If you prefer instead to drop all glyph names
             and keep the post format 3.0, set keep_glyph_names=False.
         inplace (bool): whether to create a copy or modify the input font. By default
-            the input font is modified.
+            the input font is modified. The copy is loaded from the compiled input
+            font with the same configuration; its tables are decompiled when they
+            are accessed, unless the input TTFont was loaded with lazy=False.
+        skip_if_subroutinized (bool): if True, and the font already contains some
+            subroutines and no conversion to a different CFF table format was
+            requested, assume it was already subroutinized and leave its table as
+            it is. By default, the font is always re-subroutinized.
 
     Returns:
         The modified font containing the subroutinized CFF or CFF2 table.
@@ -170,6 +367,28 @@ def subroutinize(
         cffsubr.Error if the font doesn't contain 'CFF ' or 'CFF2' table,
         or if subroutinization process fails.
     """
+    otf, input_format, output_format, tx_input_data = _prepare_subroutinize(
+        otf, cff_version, inplace, skip_if_subroutinized
+    )
+    if tx_input_data is None:
+        return otf
+
+    compressed_cff_data = _tx_subroutinize(tx_input_data, output_format)
+
+    return _replace_cff_table(
+        otf, input_format, output_format, compressed_cff_data, keep_glyph_names
+    )
+
+
+def _prepare_subroutinize(
+    otf: ttLib.TTFont,
+    cff_version: Optional[int],
+    inplace: bool,
+    skip_if_subroutinized: bool,
+) -> Tuple[ttLib.TTFont, CFFTableTag, CFFTableTag, Optional[memoryview]]:
+    """Return the font to modify, its input and output CFF table tags, and the
+    data to pass on to tx, or None if the font must be left as it is.
+    """
     input_format = _sniff_cff_table_format(otf)
 
     if cff_version is None:
@@ -177,18 +396,32 @@ def subroutinize(
     else:
         output_format = CFFTableTag.from_version(cff_version)
 
-    if not inplace:
-        otf = copy.deepcopy(otf)
+    if skip_if_subroutinized and output_format == input_format and has_subroutines(otf):
+        return (
+            otf if inplace else _copy_font(otf),
+            input_format,
+            output_format,
+            None,
+        )
 
     # ensure the glyph order is decompiled before CFF table is replaced
     _ = otf.getGlyphOrder()
 
-    buf = io.BytesIO()
-    otf.save(buf)
-    otf_data = buf.getvalue()
+    if not inplace:
+        otf = _copy_font(otf)
+
+    tx_input_data = _compile_tx_input(otf, input_format)
+
+    return otf, input_format, output_format, tx_input_data
 
-    compressed_cff_data = _tx_subroutinize(otf_data, output_format)
 
+def _replace_cff_table(
+    otf: ttLib.TTFont,
+    input_format: CFFTableTag,
+    output_format: CFFTableTag,
+    compressed_cff_data: bytes,
+    keep_glyph_names: bool,
+) -> ttLib.TTFont:
     cff_table = ttLib.newTable(output_format)
     cff_table.decompile(compressed_cff_data, otf)
 
@@ -213,6 +446,71 @@ def subroutinize(
     return otf
 
 
+def subroutinize_many(
+    fonts: Iterable[ttLib.TTFont],
+    cff_version: Optional[int] = None,
+    keep_glyph_names: bool = True,
+    inplace: bool = True,
+    skip_if_subroutinized: bool = False,
+    max_workers: Optional[int] = None,
+) -> List[ttLib.TTFont]:
+    """Run subroutinizer on several fonts concurrently.
+
+    Each font is processed by a separate tx process; these are run in parallel
+    from a pool of worker threads. The fontTools work (preparing the tx input and
+    decompiling its output) is done in the calling thread, while the tx processes
+    for the other fonts are running: the output of each finished tx process is
+    decompiled before the input of the next font is prepared. At most twice as
+    many tx inputs as worker threads are held in memory at the same time.
+
+    Args:
+        fonts (Iterable[TTFont]): the input CFF-flavored OTFs.
+        cff_version, keep_glyph_names, inplace, skip_if_subroutinized: same as
+            for `subroutinize`.
+        max_workers (Optional[int]): the maximum number of tx processes that are
+            run at the same time. By default, the number of CPUs.
+
+    Returns:
+        The list of modified fonts, in the same order as the input.
+
+    Raises:
+        cffsubr.Error if any of the fonts doesn't contain 'CFF ' or 'CFF2' table,
+        or if subroutinization process fails.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = 2 * max_workers
+    results = []
+    pending = {}
+
+    def finish(done):
+        for future in done:
+            otf, input_format, output_format = pending.pop(future)
+            _replace_cff_table(
+                otf, input_format, output_format, future.result(), keep_glyph_names
+            )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        for otf in fonts:
+            if pending:
+                # Block only when enough jobs are queued to keep all workers busy.
+                done, _ = concurrent.futures.wait(
+                    pending,
+                    timeout=None if len(pending) >= max_pending else 0,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                finish(done)
+            otf, input_format, output_format, tx_input_data = _prepare_subroutinize(
+                otf, cff_version, inplace, skip_if_subroutinized
+            )
+            if tx_input_data is not None:
+                future = executor.submit(_tx_subroutinize, tx_input_data, output_format)
+                pending[future] = (otf, input_format, output_format)
+            results.append(otf)
+
+        finish(concurrent.futures.as_completed(list(pending)))
+    return results
+
+
 def set_post_table_format(otf, formatType):
     if formatType not in (2.0, 3.0):
         raise NotImplementedError(formatType)
@@ -235,14 +533,18 @@ def has_subroutines(otf: ttLib.TTFont) -> bool:
     """Return True if the font's CFF or CFF2 table contains any subroutines."""
     table_tag = _sniff_cff_table_format(otf)
     top_dict = otf[table_tag].cff.topDictIndex[0]
-    all_subrs = [top_dict.GlobalSubrs]
+    # stop at the first non-empty subroutines INDEX
+    if len(top_dict.GlobalSubrs):
+        return True
     if hasattr(top_dict, "FDArray"):
-        all_subrs.extend(
-            fd.Private.Subrs for fd in top_dict.FDArray if hasattr(fd.Private, "Subrs")
+        return any(
+            len(fd.Private.Subrs) > 0
+            for fd in top_dict.FDArray
+            if hasattr(fd.Private, "Subrs")
         )
     elif hasattr(top_dict.Private, "Subrs"):
-        all_subrs.append(top_dict.Private.Subrs)
-    return any(all_subrs)
+        return len(top_dict.Private.Subrs) > 0
+    return False
 
 
 def desubroutinize(otf: ttLib.TTFont, inplace=True) -> ttLib.TTFont:
@@ -261,10 +563,6 @@ def desubroutinize(otf: ttLib.TTFont, inplace=True) -> ttLib.TTFont:
         cffsubr.Error if the font doesn't contain 'CFF ' or 'CFF2' table,
         or if desubroutinization process fails.
     """
-    # the 'desubroutinize' method is dynamically added to the CFF table class
-    # as a side-effect of importing the fontTools.subset.cff module...
-    from fontTools.subset import cff as _
-
     if not inplace:
         otf = copy.deepcopy(otf)
 
@@ -1,3 +1,4 @@
+import contextlib
 import sys
 import argparse
 from fontTools import ttLib
@@ -9,7 +10,11 @@ def main(args=None):
 
     parser = argparse.ArgumentParser("cffsubr", description=main.__doc__)
     parser.add_argument(
-        "input_file", help="input font file. Must contain either CFF or CFF2 table"
+        "input_files",
+        metavar="input_file",
+        nargs="+",
+        help="input font file(s). Must contain either CFF or CFF2 table. "
+        "Multiple input files are only allowed with -i option",
     )
     output_group = parser.add_mutually_exclusive_group()
     output_group.add_argument(
@@ -45,8 +50,21 @@ def main(args=None):
         action="store_true",
         help="Don't subroutinize, instead remove all subroutines (if any).",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=None,
+        type=int,
+        help="number of input files to process in parallel. Default: number of CPUs",
+    )
     options = parser.parse_args(args)
 
+    if len(options.input_files) > 1:
+        if not options.inplace:
+            parser.error("multiple input files require -i/--inplace")
+        return _process_many_inplace(options)
+
+    options.input_file = options.input_files[0]
     if options.inplace:
         options.output_file = options.input_file
     elif not options.output_file:
@@ -64,5 +82,25 @@ def main(args=None):
         font.save(options.output_file)
 
 
+def _process_many_inplace(options):
+    with contextlib.ExitStack() as stack:
+        fonts = [
+            stack.enter_context(ttLib.TTFont(input_file))
+            for input_file in options.input_files
+        ]
+        if options.desubroutinize:
+            for font in fonts:
+                cffsubr.desubroutinize(font)
+        else:
+            cffsubr.subroutinize_many(
+                fonts,
+                options.cff_version,
+                options.keep_glyph_names,
+                max_workers=options.jobs,
+            )
+        for font, input_file in zip(fonts, options.input_files):
+            font.save(input_file)
+
+
 if __name__ == "__main__":
     main()
@@ -3,6 +3,9 @@ import pathlib
 import logging
 from fontTools import ttLib
 from fontTools import cffLib
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.basePen import NullPen
+from fontTools.pens.t2CharStringPen import T2CharStringPen
 import cffsubr
 import pytest
 
@@ -16,14 +19,39 @@ def load_test_font(name):
     buf = io.BytesIO()
     font.save(buf)
     buf.seek(0)
-    return ttLib.TTFont(buf)
+    return ttLib.TTFont(buf, lazy=True)
 
 
 def recompile_font(otf):
     buf = io.BytesIO()
     otf.save(buf)
     buf.seek(0)
-    return ttLib.TTFont(buf)
+    return ttLib.TTFont(buf, lazy=True)
+
+
+def build_cff2_font(num_glyphs=40):
+    # build the font in memory without compiling it, like ufo2ft does
+    glyph_order = [".notdef"] + [f"glyph{i}" for i in range(num_glyphs)]
+    fb = FontBuilder(1000, isTTF=False)
+    fb.setupGlyphOrder(glyph_order)
+    fb.setupCharacterMap({0x41 + i: f"glyph{i}" for i in range(num_glyphs)})
+    charstrings = {}
+    for name in glyph_order:
+        pen = T2CharStringPen(None, None, CFF2=True)
+        pen.moveTo((0, 0))
+        pen.lineTo((0, 100))
+        pen.lineTo((100, 0))
+        pen.closePath()
+        charstrings[name] = pen.getCharString()
+    fb.setupCFF2(charstrings)
+    fb.setupHorizontalMetrics(
+        {name: (500 + 37 * i, 0) for i, name in enumerate(glyph_order)}
+    )
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    return fb.font
 
 
 class TestSubroutinize:
@@ -64,13 +92,32 @@ class TestSubroutinize:
     )
     def test_inplace(self, testfile):
         font = load_test_font(testfile)
+        modified = font["head"].modified = 0
 
         font2 = cffsubr.subroutinize(font, inplace=False)
         assert font is not font2
+        assert font["head"].modified == modified
+        assert not cffsubr.has_subroutines(font)
+        assert cffsubr.has_subroutines(font2)
+        assert font2.getGlyphOrder() == font.getGlyphOrder()
 
         font3 = cffsubr.subroutinize(font, inplace=True)
         assert font3 is font
 
+    def test_not_inplace_save_lazy_copy(self, tmp_path):
+        font = load_test_font("SourceSansPro-Regular.subset.ttx")
+        assert font.lazy is True
+        font.cfg["fontTools.ttLib.tables.otBase:USE_HARFBUZZ_REPACKER"] = False
+
+        font2 = cffsubr.subroutinize(font, inplace=False)
+        assert font2.cfg == font.cfg
+
+        output_path = tmp_path / "output.otf"
+        font2.save(output_path)
+        font3 = ttLib.TTFont(output_path)
+        assert cffsubr.has_subroutines(font3)
+        assert font3.getGlyphOrder() == font.getGlyphOrder()
+
     def test_keep_glyph_names(self):
         font = load_test_font("SourceSansPro-Regular.subset.ttx")
         glyph_order = font.getGlyphOrder()
@@ -117,6 +164,77 @@ class TestSubroutinize:
 
         assert font2.getGlyphOrder() != glyph_order
 
+    @pytest.mark.parametrize(
+        "testfile",
+        ["SourceSansPro-Regular.subset.ttx", "SourceSansVariable-Roman.subset.ttx"],
+    )
+    def test_input_tempfile_fallback(self, testfile, monkeypatch):
+        # pretend memfd_create is not available, tx input is written to a tempfile
+        monkeypatch.setattr(cffsubr, "_memfd_write", lambda data: None)
+        font = load_test_font(testfile)
+
+        cffsubr.subroutinize(font)
+
+        assert cffsubr.has_subroutines(font)
+
+    @pytest.mark.parametrize(
+        "testfile",
+        ["SourceSansPro-Regular.subset.ttx", "SourceSansVariable-Roman.subset.ttx"],
+    )
+    def test_skip_if_subroutinized(self, testfile, monkeypatch):
+        font = cffsubr.subroutinize(load_test_font(testfile))
+        cff_data = font.getTableData(cffsubr._sniff_cff_table_format(font))
+
+        tx_subroutinize = cffsubr._tx_subroutinize
+        calls = []
+
+        def tx_subroutinize_and_record(data, output_format):
+            calls.append(output_format)
+            return tx_subroutinize(data, output_format)
+
+        monkeypatch.setattr(cffsubr, "_tx_subroutinize", tx_subroutinize_and_record)
+
+        assert cffsubr.subroutinize(font, skip_if_subroutinized=True) is font
+
+        font2 = cffsubr.subroutinize(font, inplace=False, skip_if_subroutinized=True)
+        assert font2 is not font
+        assert font2.getTableData(cffsubr._sniff_cff_table_format(font2)) == cff_data
+        assert not calls
+
+        # converting to a different CFF table format is never skipped
+        cff_version = 1 if "CFF2" in font else 2
+        font3 = cffsubr.subroutinize(
+            font, cff_version=cff_version, skip_if_subroutinized=True
+        )
+        assert calls == [cffsubr.CFFTableTag.from_version(cff_version)]
+        assert cffsubr._sniff_cff_table_format(font3) == calls[0]
+
+    def test_not_inplace_recalc_bboxes_from_uncompiled_font(self):
+        font = build_cff2_font()
+        font2 = build_cff2_font()
+
+        copy = recompile_font(cffsubr.subroutinize(font, inplace=False))
+        expected = recompile_font(cffsubr.subroutinize(font2, inplace=True))
+
+        for attr in ("advanceWidthMax", "minRightSideBearing", "xMaxExtent"):
+            assert getattr(copy["hhea"], attr) == getattr(expected["hhea"], attr)
+        for attr in ("xMin", "yMin", "xMax", "yMax"):
+            assert getattr(copy["head"], attr) == getattr(expected["head"], attr)
+        assert expected["hhea"].advanceWidthMax > 0
+        assert expected["head"].xMax > 0
+
+    def test_cff2_to_cff_widths_from_uncompiled_font(self):
+        font = build_cff2_font()
+        hmtx = font["hmtx"]
+
+        cffsubr.subroutinize(font, cff_version=1)
+
+        char_strings = font["CFF "].cff.topDictIndex[0].CharStrings
+        for glyph_name in font.getGlyphOrder():
+            char_string = char_strings[glyph_name]
+            char_string.draw(NullPen())
+            assert char_string.width == hmtx[glyph_name][0]
+
     def test_non_standard_upem_mute_font_matrix_warning(self, caplog):
         # See https://github.com/adobe-type-tools/cffsubr/issues/13
         font = load_test_font("FontMatrixTest.ttx")
@@ -134,6 +252,52 @@ class TestSubroutinize:
         )
 
 
+def test_subroutinize_many():
+    fonts = [
+        load_test_font("SourceSansPro-Regular.subset.ttx"),
+        load_test_font("SourceSansVariable-Roman.subset.ttx"),
+    ]
+
+    result = cffsubr.subroutinize_many(fonts, inplace=False, max_workers=2)
+
+    assert len(result) == len(fonts)
+    for font, font2 in zip(fonts, result):
+        assert font2 is not font
+        assert cffsubr._sniff_cff_table_format(font2) == (
+            cffsubr._sniff_cff_table_format(font)
+        )
+        assert not cffsubr.has_subroutines(font)
+        assert cffsubr.has_subroutines(font2)
+
+
+def test_subroutinize_many_bounded_pending(monkeypatch):
+    fonts = [load_test_font("SourceSansPro-Regular.subset.ttx") for _ in range(5)]
+    prepare = cffsubr._prepare_subroutinize
+    replace = cffsubr._replace_cff_table
+    events = []
+
+    def prepare_and_record(*args):
+        events.append("prepare")
+        return prepare(*args)
+
+    def replace_and_record(*args):
+        events.append("replace")
+        return replace(*args)
+
+    monkeypatch.setattr(cffsubr, "_prepare_subroutinize", prepare_and_record)
+    monkeypatch.setattr(cffsubr, "_replace_cff_table", replace_and_record)
+
+    result = cffsubr.subroutinize_many(fonts, max_workers=1)
+
+    assert all(cffsubr.has_subroutines(font) for font in result)
+    assert events.count("prepare") == events.count("replace") == len(fonts)
+    # no more than 2 * max_workers tx inputs are pending at any time
+    pending = 0
+    for event in events:
+        pending += 1 if event == "prepare" else -1
+        assert pending <= 2
+
+
 @pytest.mark.parametrize(
     "testfile, table_tag",
     [
@@ -147,6 +311,24 @@ def test_sniff_cff_table_format(testfile, table_tag):
     assert cffsubr._sniff_cff_table_format(font) == table_tag
 
 
+@pytest.mark.parametrize(
+    "testfile, table_tag",
+    [
+        ("SourceSansPro-Regular.subset.ttx", "CFF "),
+        ("SourceSansVariable-Roman.subset.ttx", "CFF2"),
+    ],
+)
+def test_compile_tx_input(testfile, table_tag):
+    font = load_test_font(testfile)
+
+    data = cffsubr._compile_tx_input(font, cffsubr.CFFTableTag(table_tag))
+
+    font2 = ttLib.TTFont(io.BytesIO(data))
+    assert table_tag in font2
+    assert "GSUB" in font and "GSUB" not in font2
+    assert font2.getTableData(table_tag) == font.getTableData(table_tag)
+
+
 def test_sniff_cff_table_format_invalid():
     with pytest.raises(cffsubr.Error, match="Invalid OTF"):
         cffsubr._sniff_cff_table_format(ttLib.TTFont())